@@ -8,27 +8,27 @@ Concall Transcript Downloader
 
 import os
 import re
+import argparse
 import json
 import base64
+import functools
+import shutil
+import uuid
 import time
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from io import BytesIO
 
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
+from bs4 import BeautifulSoup, SoupStrainer
+from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
+from google.auth.transport.requests import AuthorizedSession
 from google.oauth2.service_account import Credentials
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseUpload
 
 # =============================================================================
 # CONFIGURATION
@@ -39,8 +39,51 @@ DRIVE_FOLDER_ID = os.getenv("DRIVE_FOLDER_ID", "1ezP5ez-SOuHuU5C13RU-Ndl-g4aa9VV
 
 # Timeouts
 PAGE_LOAD_TIMEOUT = 30
+PAGE_REQUEST_TIMEOUT = 15
 ELEMENT_WAIT_TIMEOUT = 15
-DOWNLOAD_DELAY = 0.5  # Delay between downloads to avoid rate limiting
+DOWNLOAD_DELAY = 0.5  # Minimum interval between download starts (global rate limit)
+DOWNLOAD_TIMEOUT = 30
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# Local cache of PDF URLs already in Drive, so re-runs skip them without
+# touching Screener or Drive
+CACHE_DIR = os.getenv("TRANSCRIPT_CACHE_DIR", os.path.expanduser("~/.transcript_downloader"))
+UPLOADED_CACHE_FILE = os.path.join(CACHE_DIR, "uploaded.json")
+SEEN_CACHE_FILE = os.path.join(CACHE_DIR, "seen.json")  # Scraped transcript index
+
+# Drive REST endpoints (used directly by the upload workers)
+DRIVE_FILES_URL = "https://www.googleapis.com/drive/v3/files"
+DRIVE_UPLOAD_URL = "https://www.googleapis.com/upload/drive/v3/files"
+
+# Drive batch requests accept at most 100 calls each
+DRIVE_BATCH_SIZE = 100
+
+# Concurrency
+DOWNLOAD_WORKERS = int(os.getenv("DL_WORKERS", "12"))
+COMPANY_WORKERS = 16  # Parallel company page fetches (fallback scrape)
+MAX_COMPANIES = 100  # Limit for the company-wise fallback
+
+# HTTP connection pool size (kept >= worker count to avoid "pool is full")
+HTTP_POOL_SIZE = max(32, DOWNLOAD_WORKERS, COMPANY_WORKERS)
+
+# Browser and HTTP session share a user agent so the login cookie stays valid
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+)
+
+# Patterns used when parsing transcript rows
+_QUARTER_RE = re.compile(r'Q(\d)', re.IGNORECASE)
+_FY_RE = re.compile(r'FY\s*(\d{2,4})', re.IGNORECASE)
+_DATE_RE = re.compile(r'(\d{1,2}[-/]\d{1,2}[-/]\d{2,4})')
+# Fiscal year and quarter tokens of a transcript row, found in one scan. The
+# date stays a separate search: cells are joined without a separator, so an
+# FY cell next to a date ("FY2412-03-2024") would swallow the date's digits
+_ROW_TOKEN_RE = re.compile(r'FY\s*(?P<fy>\d{2,4})|Q(?P<q>\d)', re.IGNORECASE)
+_NAME_END_RE = re.compile(r'\d|Q\d|FY')
+
+# Strips characters that aren't allowed in filenames
+_FN_TRANSLATE = str.maketrans('', '', '<>:"/\\|?*')
 
 # Logging setup
 logging.basicConfig(
@@ -50,6 +93,52 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# =============================================================================
+# LOCAL CACHE
+# =============================================================================
+
+def load_json_cache(path, default):
+    """Load a JSON cache file, falling back to default if missing or corrupt."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable cache {path}: {e}")
+        return default
+
+def save_json_cache(path, data):
+    """Atomically write a JSON cache file."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=1)
+    os.replace(tmp_path, path)
+
+def load_uploaded_urls():
+    """Get the set of PDF URLs already present in Drive from earlier runs."""
+    return set(load_json_cache(UPLOADED_CACHE_FILE, []))
+
+def save_uploaded_urls(urls):
+    """Persist the set of PDF URLs present in Drive."""
+    save_json_cache(UPLOADED_CACHE_FILE, sorted(urls))
+
+def load_seen_transcripts():
+    """Get the transcript index from earlier runs, keyed by PDF URL."""
+    return load_json_cache(SEEN_CACHE_FILE, {})
+
+def save_seen_transcripts(seen):
+    """Persist the transcript index."""
+    save_json_cache(SEEN_CACHE_FILE, seen)
+
+def merge_seen_transcripts(seen, transcripts):
+    """Add newly scraped transcripts to the index, stamping when first seen."""
+    now = datetime.now().isoformat(timespec="seconds")
+    for transcript in transcripts:
+        if transcript.get("pdf_url") and transcript["pdf_url"] not in seen:
+            seen[transcript["pdf_url"]] = {**transcript, "seen_at": now}
+
 # =============================================================================
 # GOOGLE DRIVE AUTHENTICATION
 # =============================================================================
@@ -79,90 +168,139 @@ def get_google_credentials():
 # HTTP SESSION
 # =============================================================================
 
-def create_session():
-    """Create requests session with retry logic."""
-    session = requests.Session()
+def mount_pooled_adapter(session):
+    """Mount a retrying, keep-alive connection pool on a requests session."""
     retry = Retry(total=3, backoff_factor=1, status_forcelist=[429, 500, 502, 503, 504])
-    adapter = HTTPAdapter(max_retries=retry)
+    adapter = HTTPAdapter(
+        max_retries=retry,
+        pool_connections=HTTP_POOL_SIZE,
+        pool_maxsize=HTTP_POOL_SIZE,
+        pool_block=False,
+    )
     session.mount("http://", adapter)
     session.mount("https://", adapter)
+
+def create_session():
+    """Create requests session with retry logic and keep-alive connection pooling."""
+    session = requests.Session()
+    mount_pooled_adapter(session)
+    session.headers.update({
+        "User-Agent": USER_AGENT,
+        "Connection": "keep-alive",
+        "Accept-Encoding": "gzip, deflate",
+    })
     return session
 
-# =============================================================================
-# SELENIUM WEBDRIVER
-# =============================================================================
+class RateLimiter:
+    """Space out calls across threads by a minimum interval."""
 
-def create_webdriver():
-    """Create headless Chrome webdriver."""
-    options = Options()
-    options.add_argument("--headless")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
-    options.add_argument("--disable-gpu")
-    options.add_argument("--window-size=1920,1080")
-    options.add_argument(
-        "--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-        "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-    )
-    
-    service = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=options)
-    driver.set_page_load_timeout(PAGE_LOAD_TIMEOUT)
-    return driver
+    def __init__(self, interval):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._next_time = 0.0
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next_time - now
+            self._next_time = max(now, self._next_time) + self.interval
+        if delay > 0:
+            time.sleep(delay)
 
 # =============================================================================
 # SCREENER.IN LOGIN
 # =============================================================================
 
-def login_to_screener(driver, username, password):
-    """Login to Screener.in"""
+# Resources the login form doesn't need; skipping them keeps Chromium small
+_BLOCKED_RESOURCE_TYPES = {"image", "media", "font"}
+
+def _block_heavy_resources(route):
+    """Abort requests for resources the login page doesn't need."""
+    if route.request.resource_type in _BLOCKED_RESOURCE_TYPES:
+        route.abort()
+    else:
+        route.continue_()
+
+def launch_browser(playwright):
+    """Launch headless Chromium."""
+    return playwright.chromium.launch(
+        headless=True,
+        args=["--no-sandbox", "--disable-dev-shm-usage", "--disable-gpu"],
+    )
+
+def login_to_screener(session, username, password):
+    """Login to Screener.in and copy the login cookies into the requests session."""
     logger.info("Logging in to Screener.in...")
     
-    driver.get("https://www.screener.in/login/")
-    wait = WebDriverWait(driver, ELEMENT_WAIT_TIMEOUT)
-    
     try:
-        username_field = wait.until(EC.presence_of_element_located((By.NAME, "username")))
-        username_field.clear()
-        username_field.send_keys(username)
-        
-        password_field = driver.find_element(By.NAME, "password")
-        password_field.clear()
-        password_field.send_keys(password)
-        
-        login_button = driver.find_element(By.CSS_SELECTOR, "button[type='submit']")
-        login_button.click()
-        
-        time.sleep(2)
+        with sync_playwright() as playwright:
+            browser = launch_browser(playwright)
+            try:
+                context = browser.new_context(user_agent=USER_AGENT)
+                context.route("**/*", _block_heavy_resources)
+                page = context.new_page()
+                page.goto("https://www.screener.in/login/", timeout=PAGE_LOAD_TIMEOUT * 1000)
+                
+                page.fill('input[name="username"]', username, timeout=ELEMENT_WAIT_TIMEOUT * 1000)
+                page.fill('input[name="password"]', password)
+                page.click("button[type='submit']")
+                
+                # Proceed as soon as Screener redirects away from the login page
+                try:
+                    page.wait_for_url(
+                        lambda url: "login" not in url.lower(),
+                        timeout=ELEMENT_WAIT_TIMEOUT * 1000,
+                    )
+                except PlaywrightTimeoutError:
+                    logger.error("Login failed")
+                    return False
+                
+                copy_cookies_to_session(context.cookies(), session)
+            finally:
+                # Free Chromium's memory before the scrape/upload phases
+                browser.close()
         
-        if "login" not in driver.current_url.lower():
-            logger.info("Login successful")
-            return True
-        else:
-            logger.error("Login failed")
-            return False
+        logger.info("Login successful")
+        return True
             
     except Exception as e:
         logger.error(f"Login error: {e}")
         return False
 
+def copy_cookies_to_session(cookies, session):
+    """Copy browser cookies (incl. login session) into the requests session."""
+    for cookie in cookies:
+        session.cookies.set(
+            cookie["name"], cookie["value"],
+            domain=cookie.get("domain"), path=cookie.get("path", "/"),
+        )
+
 # =============================================================================
 # SCRAPE TRANSCRIPTS
 # =============================================================================
 
-def get_all_companies(driver):
+# Screener pages are server-rendered, so once logged in they are fetched
+# with plain HTTP GETs; the browser is only needed for the login form
+
+# Pages that are only searched for links skip building the rest of the DOM
+ANCHORS_ONLY = SoupStrainer("a", href=True)
+
+def fetch_soup(session, url, parse_only=None):
+    """Fetch a page with the authenticated session and parse it."""
+    response = session.get(url, timeout=PAGE_REQUEST_TIMEOUT)
+    return BeautifulSoup(response.content, "lxml", parse_only=parse_only)
+
+def get_all_companies(session):
     """Get list of all companies from Screener.in"""
     logger.info("Fetching company list...")
     
-    companies = []
+    # Keyed by URL so repeated links (site chrome on every page) are dropped as we go
+    companies = {}
     page = 1
     
     while True:
         url = f"https://www.screener.in/screens/71064/all-companies/?page={page}"
-        driver.get(url)
-        time.sleep(1)
-        
-        soup = BeautifulSoup(driver.page_source, "html.parser")
+        soup = fetch_soup(session, url, parse_only=ANCHORS_ONLY)
         
         # Find company links
         company_links = soup.select("a[href*='/company/']")
@@ -172,18 +310,22 @@ def get_all_companies(driver):
         
         for link in company_links:
             href = link.get("href", "")
+            if "/company/" not in href:
+                continue
+            company_url = f"https://www.screener.in{href}" if href.startswith("/") else href
+            if company_url in companies:
+                continue
             name = link.get_text(strip=True)
-            if "/company/" in href and name:
-                company_url = f"https://www.screener.in{href}" if href.startswith("/") else href
-                companies.append({
+            if name:
+                companies[company_url] = {
                     "name": name,
                     "url": company_url
-                })
+                }
         
         logger.info(f"Page {page}: Found {len(company_links)} companies")
         
         # Check for next page
-        next_button = soup.select_one("a.next, a[rel='next'], .pagination a:contains('Next')")
+        next_button = soup.select_one("a.next, a[rel='next'], a:-soup-contains('Next')")
         if not next_button:
             # Check if we've collected enough or no more pages
             if page > 50:  # Safety limit
@@ -195,19 +337,15 @@ def get_all_companies(driver):
         if page > 100:  # Maximum pages to prevent infinite loop
             break
     
-    # Remove duplicates
-    seen = set()
-    unique_companies = []
-    for company in companies:
-        if company["url"] not in seen:
-            seen.add(company["url"])
-            unique_companies.append(company)
-    
-    logger.info(f"Total unique companies: {len(unique_companies)}")
-    return unique_companies
+    logger.info(f"Total unique companies: {len(companies)}")
+    return list(companies.values())
 
-def scrape_transcripts_page(driver, session):
-    """Scrape transcripts from the main transcripts page."""
+def scrape_transcripts_page(session, seen=None):
+    """Scrape transcripts from the main transcripts page.
+    
+    Newest transcripts come first, so if ``seen`` (PDF URLs from earlier
+    runs) is given, stops at the first page with nothing new on it.
+    """
     logger.info("Fetching transcripts from main page...")
     
     transcripts = []
@@ -215,10 +353,7 @@ def scrape_transcripts_page(driver, session):
     
     while True:
         url = f"https://www.screener.in/transcripts/?page={page}"
-        driver.get(url)
-        time.sleep(1)
-        
-        soup = BeautifulSoup(driver.page_source, "html.parser")
+        soup = fetch_soup(session, url)
         
         # Find transcript entries
         # Screener.in typically shows transcripts in a table or list
@@ -232,13 +367,19 @@ def scrape_transcripts_page(driver, session):
             logger.info(f"No more transcripts found on page {page}")
             break
         
+        page_transcripts = []
         for row in rows:
             transcript = parse_transcript_row(row)
             if transcript:
-                transcripts.append(transcript)
+                page_transcripts.append(transcript)
+        transcripts.extend(page_transcripts)
         
         logger.info(f"Page {page}: Found {len(rows)} items")
         
+        if seen and page_transcripts and all(t["pdf_url"] in seen for t in page_transcripts):
+            logger.info(f"Page {page}: Nothing new since last run, stopping")
+            break
+        
         # Check for next page
         pagination = soup.select_one("a.next, a[rel='next']")
         if not pagination:
@@ -277,20 +418,22 @@ def parse_transcript_row(row):
         # Extract company name and date
         text = row.get_text(strip=True) if hasattr(row, 'get_text') else str(row)
         
-        # Try to extract date (formats: DD-MM-YYYY, DD/MM/YYYY, Month YYYY, etc.)
-        date_match = re.search(r'(\d{1,2}[-/]\d{1,2}[-/]\d{2,4})', text)
+        # Try to extract date (formats: DD-MM-YYYY, DD/MM/YYYY)
+        date_match = _DATE_RE.search(text)
         date_str = date_match.group(1) if date_match else ""
         
-        # Try to extract quarter info
-        quarter_match = re.search(r'Q(\d)', text, re.IGNORECASE)
-        quarter = f"Q{quarter_match.group(1)}" if quarter_match else ""
-        
-        # Try to extract fiscal year
-        fy_match = re.search(r'FY\s*(\d{2,4})', text, re.IGNORECASE)
-        fiscal_year = f"FY{fy_match.group(1)}" if fy_match else ""
+        # Extract quarter and fiscal year; the first occurrence of each wins
+        found = {}
+        for match in _ROW_TOKEN_RE.finditer(text):
+            found.setdefault(match.lastgroup, match.group(match.lastgroup))
+            if len(found) == 2:
+                break
+        quarter = f"Q{found['q']}" if "q" in found else ""
+        fiscal_year = f"FY{found['fy']}" if "fy" in found else ""
         
         # Extract company name (usually first part before date/quarter info)
-        company_name = re.split(r'\d|Q\d|FY', text)[0].strip()
+        name_end = _NAME_END_RE.search(text)
+        company_name = (text[:name_end.start()] if name_end else text).strip()
         company_name = company_name.replace("Transcript", "").strip()
         
         return {
@@ -306,15 +449,12 @@ def parse_transcript_row(row):
         logger.debug(f"Error parsing row: {e}")
         return None
 
-def get_company_transcripts(driver, company_url, session):
+def get_company_transcripts(session, company_url):
     """Get transcripts for a specific company."""
     transcripts = []
     
     try:
-        driver.get(company_url)
-        time.sleep(0.5)
-        
-        soup = BeautifulSoup(driver.page_source, "html.parser")
+        soup = fetch_soup(session, company_url, parse_only=ANCHORS_ONLY)
         
         # Look for documents/transcripts section
         # Screener.in typically has a "Documents" section on company pages
@@ -330,8 +470,8 @@ def get_company_transcripts(driver, company_url, session):
                     href = f"https://www.screener.in{href}" if href.startswith("/") else href
                 
                 # Parse quarter/FY from text
-                quarter_match = re.search(r'Q(\d)', text, re.IGNORECASE)
-                fy_match = re.search(r'FY\s*(\d{2,4})', text, re.IGNORECASE)
+                quarter_match = _QUARTER_RE.search(text)
+                fy_match = _FY_RE.search(text)
                 
                 transcripts.append({
                     "pdf_url": href,
@@ -345,16 +485,52 @@ def get_company_transcripts(driver, company_url, session):
     
     return transcripts
 
+def get_transcripts_by_company(session, companies):
+    """Get transcripts for each company, fetching company pages in parallel."""
+    transcripts = []
+    
+    # The session is shared; urllib3's connection pool is thread-safe
+    with ThreadPoolExecutor(max_workers=COMPANY_WORKERS) as executor:
+        results = executor.map(lambda c: get_company_transcripts(session, c["url"]), companies)
+        for i, (company, company_transcripts) in enumerate(zip(companies, results), 1):
+            logger.info(f"[{i}/{len(companies)}] {company['name']}: {len(company_transcripts)} transcripts")
+            for t in company_transcripts:
+                t["company"] = company["name"]
+                transcripts.append(t)
+    
+    return transcripts
+
 # =============================================================================
 # DETERMINE QUARTER AND FISCAL YEAR
 # =============================================================================
 
+# Indian fiscal year: April to March
+# Q1: Apr-Jun, Q2: Jul-Sep, Q3: Oct-Dec, Q4: Jan-Mar
+# month -> (quarter, offset from calendar year to fiscal year)
+_MONTH_TO_Q = {
+    1: ("Q4", 0), 2: ("Q4", 0), 3: ("Q4", 0),
+    4: ("Q1", 1), 5: ("Q1", 1), 6: ("Q1", 1),
+    7: ("Q2", 1), 8: ("Q2", 1), 9: ("Q2", 1),
+    10: ("Q3", 1), 11: ("Q3", 1), 12: ("Q3", 1),
+}
+
+_DATE_FORMATS = ["%d-%m-%Y", "%d/%m/%Y", "%Y-%m-%d", "%d-%m-%y", "%d/%m/%y"]
+
+def quarter_fy_for_date(date):
+    """Get (quarter, fiscal_year) containing a date."""
+    quarter, fy_offset = _MONTH_TO_Q[date.month]
+    return quarter, f"FY{date.year + fy_offset}"
+
+# Fallback for transcripts with no usable date, fixed for the whole run
+_DEFAULT_Q_FY = quarter_fy_for_date(datetime.now())
+
+@functools.lru_cache(maxsize=4096)
 def determine_quarter_fy(date_str, text=""):
     """Determine quarter and fiscal year from date or text."""
     
     # First try to extract from text
-    quarter_match = re.search(r'Q(\d)', text, re.IGNORECASE)
-    fy_match = re.search(r'FY\s*(\d{2,4})', text, re.IGNORECASE)
+    quarter_match = _QUARTER_RE.search(text)
+    fy_match = _FY_RE.search(text)
     
     if quarter_match and fy_match:
         quarter = f"Q{quarter_match.group(1)}"
@@ -365,160 +541,386 @@ def determine_quarter_fy(date_str, text=""):
     
     # Try to parse date
     if date_str:
-        try:
-            # Try different date formats
-            for fmt in ["%d-%m-%Y", "%d/%m/%Y", "%Y-%m-%d", "%d-%m-%y", "%d/%m/%y"]:
-                try:
-                    date = datetime.strptime(date_str, fmt)
-                    month = date.month
-                    year = date.year
-                    
-                    # Indian fiscal year: April to March
-                    # Q1: Apr-Jun, Q2: Jul-Sep, Q3: Oct-Dec, Q4: Jan-Mar
-                    if month >= 4 and month <= 6:
-                        quarter = "Q1"
-                        fiscal_year = f"FY{year + 1}"
-                    elif month >= 7 and month <= 9:
-                        quarter = "Q2"
-                        fiscal_year = f"FY{year + 1}"
-                    elif month >= 10 and month <= 12:
-                        quarter = "Q3"
-                        fiscal_year = f"FY{year + 1}"
-                    else:  # Jan-Mar
-                        quarter = "Q4"
-                        fiscal_year = f"FY{year}"
-                    
-                    return quarter, fiscal_year
-                except ValueError:
-                    continue
-        except Exception:
-            pass
+        for fmt in _DATE_FORMATS:
+            try:
+                return quarter_fy_for_date(datetime.strptime(date_str, fmt))
+            except ValueError:
+                continue
     
     # Default to current quarter
-    now = datetime.now()
-    month = now.month
-    year = now.year
-    
-    if month >= 4 and month <= 6:
-        return "Q1", f"FY{year + 1}"
-    elif month >= 7 and month <= 9:
-        return "Q2", f"FY{year + 1}"
-    elif month >= 10 and month <= 12:
-        return "Q3", f"FY{year + 1}"
-    else:
-        return "Q4", f"FY{year}"
+    return _DEFAULT_Q_FY
 
 # =============================================================================
 # GOOGLE DRIVE OPERATIONS
 # =============================================================================
 
+# googleapiclient (httplib2) is not thread-safe: the shared service is only
+# used on the main thread or under _FOLDER_LOCK. Upload workers talk to the
+# Drive REST API through one requests-based AuthorizedSession, shared the
+# same way as the Screener session (google-auth makes no thread-safety
+# promise for it; requests/urllib3 pooling is what we rely on).
+
+# Serializes folder lookup/creation so workers don't create duplicate folders
+_FOLDER_LOCK = threading.Lock()
+
+# Folder IDs already looked up or created this run, keyed by (name, parent_id)
+_FOLDER_CACHE = {}
+
+# Filenames present in each folder, keyed by folder_id and listed once per run
+_FILENAMES_LOCK = threading.Lock()
+_FOLDER_FILENAMES = {}
+
+# (folder_id, filename) pairs a worker is currently uploading
+_CLAIMED_FILENAMES = set()
+
 def get_drive_service():
     """Get Google Drive service."""
     credentials = get_google_credentials()
     return build("drive", "v3", credentials=credentials)
 
+def get_drive_session():
+    """Get an authorized, requests-based HTTP session for the Drive REST API."""
+    drive_session = AuthorizedSession(get_google_credentials())
+    mount_pooled_adapter(drive_session)
+    return drive_session
+
 def get_or_create_folder(service, folder_name, parent_id):
     """Get existing folder or create new one."""
-    # Search for existing folder
-    query = f"name='{folder_name}' and mimeType='application/vnd.google-apps.folder' and '{parent_id}' in parents and trashed=false"
-    results = service.files().list(q=query, fields="files(id, name)").execute()
-    files = results.get("files", [])
-    
-    if files:
-        return files[0]["id"]
+    key = (folder_name, parent_id)
+    with _FOLDER_LOCK:
+        if key in _FOLDER_CACHE:
+            return _FOLDER_CACHE[key]
+        
+        # Search for existing folder
+        query = f"name='{folder_name}' and mimeType='application/vnd.google-apps.folder' and '{parent_id}' in parents and trashed=false"
+        results = service.files().list(q=query, fields="files(id, name)").execute()
+        files = results.get("files", [])
+        
+        if files:
+            _FOLDER_CACHE[key] = files[0]["id"]
+            return _FOLDER_CACHE[key]
+        
+        # Create new folder
+        metadata = {
+            "name": folder_name,
+            "mimeType": "application/vnd.google-apps.folder",
+            "parents": [parent_id]
+        }
+        folder = service.files().create(body=metadata, fields="id").execute()
+        logger.info(f"Created folder: {folder_name}")
+        _FOLDER_CACHE[key] = folder["id"]
+        return folder["id"]
+
+def list_subfolders(service, parent_ids):
+    """List folders directly under the given parents, keyed by (name, parent_id)."""
+    folders = {}
+    for parent_id in parent_ids:
+        page_token = None
+        while True:
+            results = service.files().list(
+                q=f"'{parent_id}' in parents and mimeType='application/vnd.google-apps.folder' and trashed=false",
+                fields="nextPageToken, files(id, name)",
+                pageSize=1000,
+                pageToken=page_token,
+            ).execute()
+            for folder in results.get("files", []):
+                folders.setdefault((folder["name"], parent_id), folder["id"])
+            page_token = results.get("nextPageToken")
+            if not page_token:
+                break
+    return folders
+
+def create_folders_batch(service, keys):
+    """Create folders in batched requests, returning IDs keyed by (name, parent_id)."""
+    created = {}
+    keys = list(keys)
+    
+    for start in range(0, len(keys), DRIVE_BATCH_SIZE):
+        pending = dict(enumerate(keys[start:start + DRIVE_BATCH_SIZE]))
+        
+        def store_id(request_id, response, exception):
+            folder_name, parent_id = pending[int(request_id)]
+            if exception is not None:
+                logger.error(f"Failed to create folder {folder_name}: {exception}")
+                return
+            created[(folder_name, parent_id)] = response["id"]
+            logger.info(f"Created folder: {folder_name}")
+        
+        batch = service.new_batch_http_request(callback=store_id)
+        for request_id, (folder_name, parent_id) in pending.items():
+            metadata = {
+                "name": folder_name,
+                "mimeType": "application/vnd.google-apps.folder",
+                "parents": [parent_id]
+            }
+            batch.add(service.files().create(body=metadata, fields="id"), request_id=str(request_id))
+        batch.execute()
+    
+    return created
+
+def ensure_drive_folders(service, folder_pairs):
+    """Make sure all (fiscal_year, quarter) folders exist, filling _FOLDER_CACHE."""
+    fiscal_years = sorted({fy for fy, _ in folder_pairs})
+    
+    with _FOLDER_LOCK:
+        # FY folders under the root
+        _FOLDER_CACHE.update(list_subfolders(service, [DRIVE_FOLDER_ID]))
+        existing_fy_ids = [
+            _FOLDER_CACHE[(fy, DRIVE_FOLDER_ID)]
+            for fy in fiscal_years if (fy, DRIVE_FOLDER_ID) in _FOLDER_CACHE
+        ]
+        _FOLDER_CACHE.update(create_folders_batch(
+            service,
+            [(fy, DRIVE_FOLDER_ID) for fy in fiscal_years if (fy, DRIVE_FOLDER_ID) not in _FOLDER_CACHE]
+        ))
+        
+        # Quarter folders; only pre-existing FY folders can already contain any
+        _FOLDER_CACHE.update(list_subfolders(service, existing_fy_ids))
+        missing = []
+        for fy, quarter in sorted(folder_pairs):
+            fy_folder_id = _FOLDER_CACHE.get((fy, DRIVE_FOLDER_ID))
+            if fy_folder_id and (quarter, fy_folder_id) not in _FOLDER_CACHE:
+                missing.append((quarter, fy_folder_id))
+        _FOLDER_CACHE.update(create_folders_batch(service, missing))
+
+def list_folder_filenames(drive_session, folder_id):
+    """Get the set of filenames in a folder, listing it once per run."""
+    with _FILENAMES_LOCK:
+        if folder_id in _FOLDER_FILENAMES:
+            return _FOLDER_FILENAMES[folder_id]
+    
+    # List without holding the lock so workers on other folders aren't held
+    # up; if two workers race on the same folder, the first result is kept
+    filenames = set()
+    page_token = None
+    while True:
+        response = drive_session.get(DRIVE_FILES_URL, params={
+            "q": f"'{folder_id}' in parents and trashed=false",
+            "fields": "nextPageToken, files(name)",
+            "pageSize": 1000,
+            "pageToken": page_token,
+        }, timeout=DOWNLOAD_TIMEOUT)
+        response.raise_for_status()
+        results = response.json()
+        filenames.update(f["name"] for f in results.get("files", []))
+        page_token = results.get("nextPageToken")
+        if not page_token:
+            break
     
-    # Create new folder
-    metadata = {
-        "name": folder_name,
-        "mimeType": "application/vnd.google-apps.folder",
-        "parents": [parent_id]
-    }
-    folder = service.files().create(body=metadata, fields="id").execute()
-    logger.info(f"Created folder: {folder_name}")
-    return folder["id"]
+    with _FILENAMES_LOCK:
+        return _FOLDER_FILENAMES.setdefault(folder_id, filenames)
 
-def file_exists_in_drive(service, filename, folder_id):
-    """Check if file already exists in folder."""
-    query = f"name='{filename}' and '{folder_id}' in parents and trashed=false"
-    results = service.files().list(q=query, fields="files(id)").execute()
-    return len(results.get("files", [])) > 0
+def claim_filename(drive_session, filename, folder_id):
+    """Reserve a filename in a folder for uploading.
+    
+    Returns "claimed", "exists" (the file is in Drive) or "in_flight"
+    (another worker is uploading the same filename right now).
+    """
+    filenames = list_folder_filenames(drive_session, folder_id)
+    with _FILENAMES_LOCK:
+        if filename in filenames:
+            return "exists"
+        if (folder_id, filename) in _CLAIMED_FILENAMES:
+            return "in_flight"
+        _CLAIMED_FILENAMES.add((folder_id, filename))
+        return "claimed"
 
-def upload_to_drive(service, file_content, filename, folder_id):
-    """Upload file to Google Drive."""
-    # Check if already exists
-    if file_exists_in_drive(service, filename, folder_id):
-        logger.info(f"  Skipped (exists): {filename}")
-        return None
+def release_filename(filename, folder_id, uploaded):
+    """End a claim_filename reservation, recording the file if it was uploaded."""
+    with _FILENAMES_LOCK:
+        _CLAIMED_FILENAMES.discard((folder_id, filename))
+        if uploaded:
+            # Claiming listed the folder, so its set is always present here
+            _FOLDER_FILENAMES[folder_id].add(filename)
+
+# Transcripts are small; a single multipart request avoids the
+# resumable-upload session handshake. The PDF is streamed straight into the
+# multipart body, so each file is held in memory only once.
+
+def new_upload_body(filename, folder_id):
+    """Start a multipart upload body for a PDF; returns (buffer, boundary).
     
+    The PDF content is written into the buffer next, then the body is
+    completed and sent by upload_to_drive.
+    """
     metadata = {
         "name": filename,
         "parents": [folder_id]
     }
     
-    media = MediaIoBaseUpload(BytesIO(file_content), mimetype="application/pdf")
-    file = service.files().create(body=metadata, media_body=media, fields="id").execute()
+    boundary = uuid.uuid4().hex
+    body = BytesIO()
+    body.write(f"--{boundary}\r\nContent-Type: application/json; charset=UTF-8\r\n\r\n".encode())
+    body.write(json.dumps(metadata).encode("utf-8"))
+    body.write(f"\r\n--{boundary}\r\nContent-Type: application/pdf\r\n\r\n".encode())
+    return body, boundary
+
+def upload_to_drive(drive_session, body, boundary, filename):
+    """Upload file to Google Drive."""
+    body.write(f"\r\n--{boundary}--\r\n".encode())
+    
+    response = drive_session.post(
+        DRIVE_UPLOAD_URL,
+        params={"uploadType": "multipart", "fields": "id"},
+        data=body.getbuffer(),
+        headers={"Content-Type": f"multipart/related; boundary={boundary}"},
+        timeout=DOWNLOAD_TIMEOUT,
+    )
+    response.raise_for_status()
     
     logger.info(f"  Uploaded: {filename}")
-    return file["id"]
+    return response.json()["id"]
 
 # =============================================================================
 # DOWNLOAD AND UPLOAD TRANSCRIPTS
 # =============================================================================
 
-def download_and_upload_transcripts(transcripts, session, drive_service):
-    """Download transcripts and upload to Google Drive."""
+def resolve_quarter_fy(transcript):
+    """Get (quarter, fiscal_year) for a transcript, preferring its own fields."""
+    quarter, fiscal_year = determine_quarter_fy(
+        transcript.get("date", ""),
+        transcript.get("raw_text", "") or transcript.get("text", "")
+    )
     
-    stats = {"downloaded": 0, "skipped": 0, "failed": 0}
+    # Use transcript's quarter/fy if available
+    if transcript.get("quarter") and transcript.get("quarter") != "Unknown":
+        quarter = transcript["quarter"]
+    if transcript.get("fiscal_year") and transcript.get("fiscal_year") != "Unknown":
+        fiscal_year = transcript["fiscal_year"]
     
-    for i, transcript in enumerate(transcripts, 1):
+    return quarter, fiscal_year
+
+def download_pdf(session, pdf_url, buffer):
+    """Stream a PDF into a buffer (e.g. an upload body) at its current position."""
+    with session.get(pdf_url, stream=True, timeout=DOWNLOAD_TIMEOUT) as response:
+        response.raise_for_status()
+        response.raw.decode_content = True  # Undo any gzip transfer encoding
+        shutil.copyfileobj(response.raw, buffer, DOWNLOAD_CHUNK_SIZE)
+
+def build_filename(company, fiscal_year, quarter):
+    """Build the Drive filename for a transcript."""
+    safe_company = company.translate(_FN_TRANSLATE)
+    return f"{safe_company} - {fiscal_year} {quarter} Transcript.pdf"
+
+def _process_one(transcript, index, total, session, drive_service, drive_session, rate_limiter):
+    """Download a single transcript and upload it to Google Drive.
+    
+    Returns one of "downloaded", "skipped" (file already in Drive),
+    "in_flight" (same filename being uploaded by another worker) or "failed".
+    """
+    try:
+        company = transcript.get("company", "Unknown")
+        pdf_url = transcript["pdf_url"]
+        
+        # Determine quarter, fiscal year and target filename
+        quarter, fiscal_year = resolve_quarter_fy(transcript)
+        filename = build_filename(company, fiscal_year, quarter)
+        
+        logger.info(f"[{index}/{total}] {company} - {fiscal_year} {quarter}")
+        
+        # Create folder structure: FY2025/Q3/ (normally already cached)
+        fy_folder_id = get_or_create_folder(drive_service, fiscal_year, DRIVE_FOLDER_ID)
+        quarter_folder_id = get_or_create_folder(drive_service, quarter, fy_folder_id)
+        
+        # Check if already uploaded (or being uploaded by another worker)
+        claim = claim_filename(drive_session, filename, quarter_folder_id)
+        if claim == "exists":
+            logger.info(f"  Skipped (exists): {filename}")
+            return "skipped"
+        if claim == "in_flight":
+            logger.info(f"  Skipped (being uploaded by another worker): {filename}")
+            return "in_flight"
+        
         try:
-            company = transcript.get("company", "Unknown")
-            pdf_url = transcript.get("pdf_url")
-            
-            if not pdf_url:
-                continue
-            
-            # Determine quarter and fiscal year
-            quarter, fiscal_year = determine_quarter_fy(
-                transcript.get("date", ""),
-                transcript.get("raw_text", "") or transcript.get("text", "")
-            )
-            
-            # Use transcript's quarter/fy if available
-            if transcript.get("quarter") and transcript.get("quarter") != "Unknown":
-                quarter = transcript["quarter"]
-            if transcript.get("fiscal_year") and transcript.get("fiscal_year") != "Unknown":
-                fiscal_year = transcript["fiscal_year"]
-            
-            logger.info(f"[{i}/{len(transcripts)}] {company} - {fiscal_year} {quarter}")
-            
-            # Create folder structure: FY2025/Q3/
-            fy_folder_id = get_or_create_folder(drive_service, fiscal_year, DRIVE_FOLDER_ID)
-            quarter_folder_id = get_or_create_folder(drive_service, quarter, fy_folder_id)
-            
-            # Clean filename
-            safe_company = re.sub(r'[<>:"/\\|?*]', '', company)
-            filename = f"{safe_company} - {fiscal_year} {quarter} Transcript.pdf"
-            
-            # Check if already uploaded
-            if file_exists_in_drive(drive_service, filename, quarter_folder_id):
-                logger.info(f"  Skipped (exists): {filename}")
-                stats["skipped"] += 1
-                continue
-            
-            # Download PDF
-            response = session.get(pdf_url, timeout=30)
-            response.raise_for_status()
+            # Download PDF straight into the upload body
+            body, boundary = new_upload_body(filename, quarter_folder_id)
+            rate_limiter.wait()
+            download_pdf(session, pdf_url, body)
             
             # Upload to Drive
-            upload_to_drive(drive_service, response.content, filename, quarter_folder_id)
-            stats["downloaded"] += 1
-            
-            time.sleep(DOWNLOAD_DELAY)
-            
-        except Exception as e:
-            logger.error(f"  Failed: {e}")
-            stats["failed"] += 1
+            upload_to_drive(drive_session, body, boundary, filename)
+        except Exception:
+            release_filename(filename, quarter_folder_id, uploaded=False)
+            raise
+        release_filename(filename, quarter_folder_id, uploaded=True)
+        return "downloaded"
+        
+    except Exception as e:
+        logger.error(f"  Failed: {e}")
+        return "failed"
+
+def download_and_upload_transcripts(transcripts, session, drive_service, drive_session):
+    """Download transcripts and upload to Google Drive."""
+    
+    stats = {"downloaded": 0, "skipped": 0, "failed": 0}
+    rate_limiter = RateLimiter(DOWNLOAD_DELAY)
+    
+    # Skip anything an earlier run already put in Drive before any
+    # folder lookups or PDF downloads
+    uploaded_urls = load_uploaded_urls()
+    pending = []
+    for transcript in transcripts:
+        pdf_url = transcript.get("pdf_url")
+        if not pdf_url:
+            continue
+        if pdf_url in uploaded_urls:
+            stats["skipped"] += 1
+        else:
+            pending.append(transcript)
+    logger.info(f"Skipping {stats['skipped']} transcripts uploaded in earlier runs")
+    
+    if not pending:
+        return stats
+    total = len(pending)
+    
+    # Create all FY/quarter folders up front in a few batched requests;
+    # on failure workers fall back to creating them one by one
+    folder_pairs = set()
+    for transcript in pending:
+        quarter, fiscal_year = resolve_quarter_fy(transcript)
+        folder_pairs.add((fiscal_year, quarter))
+    try:
+        ensure_drive_folders(drive_service, folder_pairs)
+    except Exception as e:
+        logger.warning(f"Could not prepare Drive folders: {e}")
+    
+    def record(future):
+        status = future.result()
+        stats["skipped" if status == "in_flight" else status] += 1
+        # An in-flight skip isn't cached: the other upload may still fail,
+        # and this URL must then be retried next run
+        if status in ("downloaded", "skipped"):
+            uploaded_urls.add(futures[future]["pdf_url"])
+    
+    # Workers share the HTTP sessions; stats are only touched here, on the
+    # main thread, as futures complete
+    try:
+        with ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as executor:
+            futures = {
+                executor.submit(
+                    _process_one, transcript, i, total,
+                    session, drive_service, drive_session, rate_limiter
+                ): transcript
+                for i, transcript in enumerate(pending, 1)
+            }
+            recorded = set()
+            try:
+                for future in as_completed(futures):
+                    record(future)
+                    recorded.add(future)
+            except BaseException:
+                # On Ctrl-C / cancellation only let running tasks finish;
+                # the executor's exit would otherwise work through the queue
+                executor.shutdown(wait=True, cancel_futures=True)
+                # Keep the results of tasks that finished in the meantime
+                for future in futures:
+                    if (future not in recorded and not future.cancelled()
+                            and future.exception() is None):
+                        record(future)
+                raise
+    finally:
+        # Save progress even if the run is interrupted
+        save_uploaded_urls(uploaded_urls)
     
     return stats
 
@@ -526,8 +928,20 @@ def download_and_upload_transcripts(transcripts, session, drive_service):
 # MAIN
 # =============================================================================
 
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Download concall transcripts to Google Drive")
+    parser.add_argument(
+        "--force-rescan",
+        action="store_true",
+        help="Scrape all transcript pages, even ones already in the local index",
+    )
+    return parser.parse_args()
+
 def main():
     """Main entry point."""
+    args = parse_args()
+    
     logger.info("=" * 60)
     logger.info("CONCALL TRANSCRIPT DOWNLOADER")
     logger.info("=" * 60)
@@ -541,57 +955,52 @@ def main():
     
     # Initialize
     session = create_session()
-    driver = create_webdriver()
     drive_service = get_drive_service()
+    drive_session = get_drive_session()
     
-    try:
-        # Login
-        if not login_to_screener(driver, username, password):
-            raise RuntimeError("Failed to login")
-        
-        # Get transcripts from main transcripts page
-        logger.info("\n" + "=" * 60)
-        logger.info("SCRAPING TRANSCRIPTS")
-        logger.info("=" * 60)
-        
-        transcripts = scrape_transcripts_page(driver, session)
-        
-        if not transcripts:
-            logger.warning("No transcripts found on main page. Trying company-wise...")
-            
-            # Alternative: Get companies and scrape each
-            companies = get_all_companies(driver)
-            
-            for i, company in enumerate(companies[:100], 1):  # Limit for testing
-                logger.info(f"[{i}/{len(companies)}] Checking {company['name']}...")
-                company_transcripts = get_company_transcripts(driver, company["url"], session)
-                
-                for t in company_transcripts:
-                    t["company"] = company["name"]
-                    transcripts.append(t)
-                
-                time.sleep(0.3)
-        
-        logger.info(f"\nTotal transcripts to process: {len(transcripts)}")
-        
-        # Download and upload
-        logger.info("\n" + "=" * 60)
-        logger.info("DOWNLOADING AND UPLOADING")
-        logger.info("=" * 60)
-        
-        stats = download_and_upload_transcripts(transcripts, session, drive_service)
-        
-        # Summary
-        logger.info("\n" + "=" * 60)
-        logger.info("SUMMARY")
-        logger.info("=" * 60)
-        logger.info(f"Downloaded: {stats['downloaded']}")
-        logger.info(f"Skipped (already exists): {stats['skipped']}")
-        logger.info(f"Failed: {stats['failed']}")
-        logger.info(f"Google Drive folder: https://drive.google.com/drive/folders/{DRIVE_FOLDER_ID}")
+    # Login
+    if not login_to_screener(session, username, password):
+        raise RuntimeError("Failed to login")
+    
+    # Get transcripts from main transcripts page
+    logger.info("\n" + "=" * 60)
+    logger.info("SCRAPING TRANSCRIPTS")
+    logger.info("=" * 60)
+    
+    seen = load_seen_transcripts()
+    logger.info(f"Transcripts in local index: {len(seen)}")
+    
+    new_transcripts = scrape_transcripts_page(session, None if args.force_rescan else seen)
+    
+    if not new_transcripts:
+        logger.warning("No transcripts found on main page. Trying company-wise...")
         
-    finally:
-        driver.quit()
+        # Alternative: Get companies and scrape each
+        companies = get_all_companies(session)
+        new_transcripts = get_transcripts_by_company(session, companies[:MAX_COMPANIES])
+    
+    # Process the whole index; already-uploaded ones are skipped cheaply
+    merge_seen_transcripts(seen, new_transcripts)
+    save_seen_transcripts(seen)
+    transcripts = list(seen.values())
+    
+    logger.info(f"\nTotal transcripts to process: {len(transcripts)}")
+    
+    # Download and upload
+    logger.info("\n" + "=" * 60)
+    logger.info("DOWNLOADING AND UPLOADING")
+    logger.info("=" * 60)
+    
+    stats = download_and_upload_transcripts(transcripts, session, drive_service, drive_session)
+    
+    # Summary
+    logger.info("\n" + "=" * 60)
+    logger.info("SUMMARY")
+    logger.info("=" * 60)
+    logger.info(f"Downloaded: {stats['downloaded']}")
+    logger.info(f"Skipped (already exists): {stats['skipped']}")
+    logger.info(f"Failed: {stats['failed']}")
+    logger.info(f"Google Drive folder: https://drive.google.com/drive/folders/{DRIVE_FOLDER_ID}")
 
 if __name__ == "__main__":
     main()